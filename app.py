@@ -1,59 +1,111 @@
 import glob
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 
 import pandas as pd
-import pdfplumber
-
-
-def extract_and_merge_tables(pdf_path):
-    merged_tables = []
-    previous_table_df = None
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
+import pymupdf
+
+# pdfplumber는 느린 폴백 경로에서만 쓰므로 함수 내부에서 lazy import
+
+# 매 호출마다 re 캐시를 타지 않도록 모듈 레벨에서 정규식 컴파일
+_RE_GOAL = re.compile(
+    r"교육목표\s*[:：]\s*(.*?)(?=\d\)\s*연차별\s*교과과정)", re.DOTALL
+)
+# 구간 시작/종료 구분자만 찾아 위치로 자른다 — `.*?` + lookahead의
+# 역추적 없이 순수 선형 스캔 (ch2 시작이 제2장 종료 구분자보다 먼저 오도록 배치)
+_RE_SECTION_DELIMS = re.compile(
+    r"(?P<buchik>「전공의의 연차별 수련교과과정」)"
+    r"|(?P<ch2>제\s*2\s*장\s*인턴수련\s*교과과정)"
+    r"|(?P<ch1>제\s*1\s*장\s*총\s*칙)"
+    r"|(?P<end_byeol><별첨>)"
+    r"|(?P<end_ch2>제\s*2\s*장)"
+    r"|(?P<end_ch3>제\s*3\s*장)"
+)
+
+# 열린 구간을 종료시키는 구분자 그룹들 (ch1은 제2장 계열 무엇이든 종료)
+_SECTION_TERMINATORS = {
+    "buchik": ("end_byeol",),
+    "ch1": ("ch2", "end_ch2"),
+    "ch2": ("end_ch3",),
+}
+
+# 구간을 완성시키는 종료 구분자 힌트 — 새 페이지에 이게 없으면 스캔해도 매치가 없다
+_RE_SECTION_HINT = re.compile(r"<별첨>|제\s*[23]\s*장")
+
+# 그룹명 -> (저장 폴더, 파일명, 제목)
+_BUCHIK_SECTIONS = {
+    "buchik": ("부칙", "부칙.md", "부칙"),
+    "ch1": ("제1장_총칙", "총칙.md", "제1장 총칙"),
+    "ch2": ("제2장_인턴수련_교과과정", "인턴수련_교과과정.md", "제2장 인턴수련 교과과정"),
+}
+
+
+def extract_and_merge_tables(doc, pdf_path):
+    """열린 PyMuPDF 문서에서 페이지를 넘나드는 표를 추출·병합
+
+    표 추출은 네이티브 C로 도는 PyMuPDF find_tables()를 기본 경로로 쓰고,
+    표를 못 찾은 페이지에만 pdfplumber를 lazy하게 열어 폴백한다.
+    """
+    # 페이지 루프 동안은 원시 행 리스트로만 누적하고,
+    # DataFrame은 표가 완성된 뒤 한 번만 생성 (페이지마다 concat하면 O(N²))
+    merged_tables = []  # [{"header": list, "rows": list[list]}]
+    previous_table = None
+    fallback_pdf = None  # pdfplumber 핸들 (필요해질 때 한 번만 open)
+
+    try:
+        for page_idx, page in enumerate(doc):
             # 페이지에서 가장 큰 표 추출 (여러 개면 로직 추가 필요)
-            tables = page.extract_tables()
+            found = page.find_tables()
+            if found.tables:
+                tables = [t.extract() for t in found.tables]
+            else:
+                if fallback_pdf is None:
+                    import pdfplumber
+
+                    fallback_pdf = pdfplumber.open(pdf_path)
+                tables = fallback_pdf.pages[page_idx].extract_tables()
 
             if not tables:
-                previous_table_df = None
+                previous_table = None
                 continue
 
             for table_data in tables:
-                current_df = pd.DataFrame(table_data)
-
                 # 첫 번째 행을 헤더로 가정
-                if current_df.empty:
+                if not table_data:
                     continue
 
                 # --- 병합 로직 핵심 ---
-                # 이전 테이블과 컬럼 수가 같고, 헤더(첫 행)가 동일하면 같은 테이블로 간주
+                # 이전 테이블과 헤더(첫 행)가 동일하면 같은 테이블로 간주
                 if (
-                    previous_table_df is not None
-                    and len(previous_table_df.columns) == len(current_df.columns)
-                    and previous_table_df.iloc[0].equals(current_df.iloc[0])
+                    previous_table is not None
+                    and previous_table["header"] == table_data[0]
                 ):
                     # 반복된 헤더 제거 후 합치기
-                    current_df = current_df.iloc[1:]
-                    previous_table_df = pd.concat(
-                        [previous_table_df, current_df], ignore_index=True
-                    )
-                    merged_tables[-1] = previous_table_df
+                    previous_table["rows"].extend(table_data[1:])
 
                 else:
                     # 새로운 표로 인식하고 추가
-                    merged_tables.append(current_df)
-                    previous_table_df = current_df
+                    previous_table = {
+                        "header": table_data[0],
+                        "rows": list(table_data[1:]),
+                    }
+                    merged_tables.append(previous_table)
+    finally:
+        if fallback_pdf is not None:
+            fallback_pdf.close()
 
     return merged_tables
 
 
-def process_table(df):
-    """테이블 후처리: 헤더 설정, forward fill, 행 병합"""
-    # 첫 행을 헤더로 설정
-    new_header = df.iloc[0]
-    df = df[1:]
-    df.columns = new_header
+def process_table(table):
+    """테이블 후처리: DataFrame 변환, forward fill, 행 병합
+
+    추출 단계는 {"header", "rows"} 원시 리스트만 넘기므로
+    DataFrame은 여기서 한 번만 생성한다.
+    """
+    df = pd.DataFrame(table["rows"], columns=table["header"])
 
     # 빈값/nan 정리
     df = df.fillna("").replace("nan", "")
@@ -62,123 +114,186 @@ def process_table(df):
     first_col = df.columns[0]
     df[first_col] = df[first_col].replace("", pd.NA).ffill().fillna("")
 
-    # 연차+구분이 모두 빈 줄만 이전 행의 내용에 합치기
-    merged_rows = []
-    for _, row in df.iterrows():
-        if (
-            row[df.columns[0]].strip() == ""
-            and row[df.columns[1]].strip() == ""
-            and row[df.columns[2]].strip() != ""
-        ):
-            if merged_rows:
-                merged_rows[-1][df.columns[2]] += "\n" + row[df.columns[2]]
-        else:
-            merged_rows.append(row.to_dict())
+    # 연차+구분이 모두 빈 줄만 이전 행의 내용에 합치기 (벡터 연산)
+    col0, col1, col2 = df.columns[0], df.columns[1], df.columns[2]
+    is_cont = (
+        (df[col0].str.strip() == "")
+        & (df[col1].str.strip() == "")
+        & (df[col2].str.strip() != "")
+    )
+    # 연속 행은 직전의 일반 행과 같은 그룹으로 묶어 내용을 이어 붙임
+    group_id = (~is_cont).cumsum()
 
-    return pd.DataFrame(merged_rows)
+    # 맨 앞에 일반 행 없이 등장한 연속 행은 버림 (기존 동작과 동일)
+    df = df[group_id > 0]
+    group_id = group_id[group_id > 0]
 
+    agg = {col: "first" for col in df.columns}
+    agg[col2] = "\n".join
+    return df.groupby(group_id, sort=False).agg(agg).reset_index(drop=True)
 
-def extract_education_goal(pdf_path):
-    """PDF 첫 페이지에서 교육목표 텍스트 추출"""
-    with pdfplumber.open(pdf_path) as pdf:
-        text = pdf.pages[0].extract_text() or ""
+
+def extract_education_goal(doc):
+    """열린 PyMuPDF 문서의 첫 페이지에서 교육목표 텍스트 추출"""
+    # PyMuPDF는 페이지를 lazy 로드하므로 첫 페이지만 파싱됨
+    text = doc[0].get_text() or ""
 
     # "교육목표" ~ "연차별 교과과정" 사이 텍스트 추출
-    match = re.search(
-        r"교육목표\s*[:：]\s*(.*?)(?=\d\)\s*연차별\s*교과과정)", text, re.DOTALL
-    )
+    match = _RE_GOAL.search(text)
     if match:
         return match.group(1).strip()
     return None
 
 
+@lru_cache(maxsize=None)
+def _ensure_dir(path):
+    """exist_ok mkdir을 경로당 한 번만 수행 (반복 호출 시 stat/mkdir syscall 생략)"""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_md(path, content):
+    """마크다운 파일 저장: 인코딩 후 단일 write 호출로 기록"""
+    with open(path, "wb") as f:
+        f.write(content.encode("utf-8"))
+
+
+def _write_buchik_section(kind, body, output_dir):
+    """구간 하나를 해당 폴더의 md 파일로 저장"""
+    dir_name, file_name, heading = _BUCHIK_SECTIONS[kind]
+    path = _ensure_dir(os.path.join(output_dir, dir_name))
+    _write_md(os.path.join(path, file_name), f"# {heading}\n\n{body.strip()}\n")
+    print(f"  -> {path}/{file_name}")
+
+
+def _scan_buchik_sections(buf, written, output_dir):
+    """버퍼에서 완성된 구간을 저장하고, 소비한 prefix 길이를 반환.
+
+    구분자 위치만 선형 스캔하며 시작~종료 사이를 슬라이스로 잘라낸다.
+    구간들은 서로 독립적으로 열린다 — 개별 search를 쓰던 때와 같이,
+    한 구간의 종료 구분자가 유실돼도 나머지 구간은 정상 저장된다.
+    종료 구분자는 다음 구간의 시작일 수 있어 버퍼에 남기고,
+    이미 저장한 구간 종류는 written으로 재저장을 막는다.
+    """
+    open_sections = {}  # kind -> 시작 위치
+    consumed = 0
+
+    for match in _RE_SECTION_DELIMS.finditer(buf):
+        kind = match.lastgroup
+        for open_kind in list(open_sections):
+            if kind in _SECTION_TERMINATORS[open_kind]:
+                start = open_sections.pop(open_kind)
+                _write_buchik_section(open_kind, buf[start:match.start()], output_dir)
+                written.add(open_kind)
+                consumed = match.start()
+        if (
+            kind in _BUCHIK_SECTIONS
+            and kind not in written
+            and kind not in open_sections
+        ):
+            open_sections[kind] = match.start()
+
+    # 아직 열려 있는 구간은 시작부터 버퍼에 남겨야 다음 페이지로 이어진다
+    if open_sections:
+        consumed = min(consumed, min(open_sections.values()))
+    return consumed
+
+
 def process_buchik(pdf_path, output_dir="output"):
     """부칙.pdf에서 부칙, 제1장 총칙, 제2장 인턴수련 교과과정을 분리 저장"""
-    with pdfplumber.open(pdf_path) as pdf:
-        full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+    # 전체 텍스트를 한 번에 메모리에 올리는 대신 페이지 단위로 누적하고,
+    # 구간이 완성될 때마다 저장 후 소비한 앞부분을 해제 (메모리 상한 = 최대 구간 크기).
+    # 페이지마다 문자열을 이어 붙이면 O(n²)이므로 리스트로 모았다가
+    # 종료 구분자 힌트가 보이는 페이지에서만 join + 스캔한다.
+    parts = []
+    tail = ""
+    written = set()  # 이미 저장한 구간 종류 (재스캔 시 중복 저장 방지)
+    with pymupdf.open(pdf_path) as doc:
+        for page in doc:
+            text = page.get_text() or ""
+            parts.append(text)
+
+            # 구분자가 페이지 경계에 걸칠 수 있어 누적 꼬리를 포함해 검사
+            # (꼬리는 페이지가 아무리 잘게 쪼개져도 이어지도록 rolling 유지)
+            window = tail + text
+            tail = window[-16:]
+            if not _RE_SECTION_HINT.search(window):
+                continue
 
-    # 부칙: 처음 ~ <별첨> 직전
-    buchik_match = re.search(
-        r"(「전공의의 연차별 수련교과과정」.*?)(?=<별첨>)", full_text, re.DOTALL
-    )
-    if buchik_match:
-        path = os.path.join(output_dir, "부칙")
-        os.makedirs(path, exist_ok=True)
-        with open(os.path.join(path, "부칙.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 부칙\n\n{buchik_match.group(1).strip()}\n")
-        print(f"  -> {path}/부칙.md")
-
-    # 제1장 총칙
-    ch1_match = re.search(
-        r"(제\s*1\s*장\s*총\s*칙.*?)(?=제\s*2\s*장)", full_text, re.DOTALL
-    )
-    if ch1_match:
-        path = os.path.join(output_dir, "제1장_총칙")
-        os.makedirs(path, exist_ok=True)
-        with open(os.path.join(path, "총칙.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 제1장 총칙\n\n{ch1_match.group(1).strip()}\n")
-        print(f"  -> {path}/총칙.md")
-
-    # 제2장 인턴수련 교과과정
-    ch2_match = re.search(
-        r"(제\s*2\s*장\s*인턴수련\s*교과과정.*?)(?=제\s*3\s*장)", full_text, re.DOTALL
-    )
-    if ch2_match:
-        path = os.path.join(output_dir, "제2장_인턴수련_교과과정")
-        os.makedirs(path, exist_ok=True)
-        with open(
-            os.path.join(path, "인턴수련_교과과정.md"), "w", encoding="utf-8"
-        ) as f:
-            f.write(f"# 제2장 인턴수련 교과과정\n\n{ch2_match.group(1).strip()}\n")
-        print(f"  -> {path}/인턴수련_교과과정.md")
+            buf = "\n".join(parts)
+            consumed = _scan_buchik_sections(buf, written, output_dir)
+            parts = [buf[consumed:]] if consumed else [buf]
 
 
 def convert_pdf_to_markdown(pdf_path, output_dir="output"):
     """PDF 파일 하나를 전공별 폴더에 테이블별 개별 md 파일로 저장"""
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    tables = extract_and_merge_tables(pdf_path)
 
-    if not tables:
-        print("  테이블 없음, 건너뜀")
-        return
+    # PDF는 한 번만 열고 표 추출·교육목표 추출에 같은 핸들 재사용
+    with pymupdf.open(pdf_path) as doc:
+        tables = extract_and_merge_tables(doc, pdf_path)
+
+        if not tables:
+            print("  테이블 없음, 건너뜀")
+            return
+
+        # 교육목표 추출
+        goal = extract_education_goal(doc)
 
     # 제3장 하위에 전공별 폴더 생성
-    folder_path = os.path.join(
-        output_dir, "제3장_레지던트_연차별_수련_교과과정", pdf_name, "main"
+    folder_path = _ensure_dir(
+        os.path.join(
+            output_dir, "제3장_레지던트_연차별_수련_교과과정", pdf_name, "main"
+        )
     )
-    os.makedirs(folder_path, exist_ok=True)
 
-    # 교육목표 추출 및 저장
-    goal = extract_education_goal(pdf_path)
+    # (경로, 내용)을 먼저 모은 뒤 스레드 풀로 묶어서 기록 (디스크 I/O 중첩)
+    writes = []
     if goal:
-        goal_path = os.path.join(folder_path, "교육목표.md")
-        with open(goal_path, "w", encoding="utf-8") as f:
-            f.write(f"# {pdf_name} - 교육목표\n\n{goal}\n")
-
-    for idx, df in enumerate(tables):
-        df = process_table(df)
+        writes.append(
+            (
+                os.path.join(folder_path, "교육목표.md"),
+                f"# {pdf_name} - 교육목표\n\n{goal}\n",
+            )
+        )
+
+    for idx, table in enumerate(tables):
+        df = process_table(table)
         md = df.to_markdown(index=False)
         file_name = "연차별_교과과정.md" if idx == 0 else f"table_{idx + 1}.md"
-        file_path = os.path.join(folder_path, file_name)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(f"# {pdf_name} - {file_name.replace('.md', '')}\n\n{md}\n")
+        writes.append(
+            (
+                os.path.join(folder_path, file_name),
+                f"# {pdf_name} - {file_name.replace('.md', '')}\n\n{md}\n",
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=4) as writer_pool:
+        list(writer_pool.map(lambda args: _write_md(*args), writes))
 
     goal_msg = " + 교육목표" if goal else ""
     print(f"  -> {folder_path}/ (테이블 {len(tables)}개{goal_msg})")
 
 
+def _process_one(pdf_path):
+    """PDF 하나 처리 (워커 프로세스에서 실행)"""
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    print(f"[처리중] {pdf_path}")
+    if pdf_name == "0.부칙":
+        process_buchik(pdf_path)
+    else:
+        convert_pdf_to_markdown(pdf_path)
+
+
 # 실행
-pdf_files = sorted(glob.glob("./split/*.pdf"))
-
-if not pdf_files:
-    print("PDF 파일이 없습니다.")
-else:
-    print(f"PDF {len(pdf_files)}개 발견\n")
-    for pdf_path in pdf_files:
-        pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        print(f"[처리중] {pdf_path}")
-        if pdf_name == "0.부칙":
-            process_buchik(pdf_path)
-        else:
-            convert_pdf_to_markdown(pdf_path)
-    print(f"\n완료! output/ 폴더를 확인하세요.")
+if __name__ == "__main__":
+    pdf_files = sorted(glob.glob("./split/*.pdf"))
+
+    if not pdf_files:
+        print("PDF 파일이 없습니다.")
+    else:
+        print(f"PDF {len(pdf_files)}개 발견\n")
+        # PDF별로 독립적이므로 프로세스 단위 병렬 처리 (pdfminer 파싱은 CPU-bound)
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(_process_one, pdf_files))
+        print(f"\n완료! output/ 폴더를 확인하세요.")
@@ -7,6 +7,13 @@ import streamlit as st
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
+# 렌더링 루프에서 반복 사용되는 정규식은 모듈 레벨에서 한 번만 컴파일
+_RE_SPEC_PREFIX = re.compile(r"^\d+\.")
+_RE_LEAD_NUM = re.compile(r"(\d+)")
+_RE_TABLE_FILE = re.compile(r"table_\d+\.md")
+_RE_MD_HEADING = re.compile(r"^#.*\n+")
+_RE_MD_TITLE = re.compile(r"^# (.+)")
+
 # 구분별 색상 매핑
 CATEGORY_COLORS = {
     "환자취급범위": "#e3f2fd",  # 파랑
@@ -18,6 +25,12 @@ CATEGORY_COLORS = {
 }
 
 
+def _spec_sort_key(name: str) -> int:
+    """'12.전공명' 폴더명에서 정렬용 숫자 prefix 추출 (없으면 맨 뒤)"""
+    m = _RE_LEAD_NUM.match(name)
+    return int(m.group(1)) if m else 999
+
+
 def normalize_category(raw: str) -> str:
     """공백 제거하여 구분 값 정규화 (예: '교 과 내 용' -> '교과내용')"""
     return raw.replace(" ", "").strip()
@@ -28,56 +41,74 @@ def preserve_newlines(text: str) -> str:
     return text.replace("<br>", "\n").replace("\n", "  \n")
 
 
+# 정규화된 구분 값 -> 색상 매핑을 모듈 로드 시 한 번만 계산
+_NORMALIZED_COLORS = {normalize_category(k): v for k, v in CATEGORY_COLORS.items()}
+
+
 def get_category_color(raw: str) -> str:
-    return CATEGORY_COLORS.get(normalize_category(raw), "#ffffff")
+    return _NORMALIZED_COLORS.get(raw.replace(" ", ""), "#ffffff")
 
 
-@st.cache_data
+@st.cache_data(show_spinner=False)
 def parse_md_table(text: str) -> pd.DataFrame | None:
     """마크다운 텍스트에서 테이블을 파싱하여 DataFrame으로 반환"""
     lines = [l for l in text.strip().splitlines() if l.startswith("|")]
     if len(lines) < 3:
         return None
     header = [c.strip() for c in lines[0].split("|")[1:-1]]
-    rows = []
+    # 행 리스트 대신 열 단위로 모아 DataFrame의 행->열 변환 비용 제거
+    cols = [[] for _ in header]
+    n_cols = len(header)
     for line in lines[2:]:  # separator 건너뜀
         cells = [c.strip() for c in line.split("|")[1:-1]]
-        if len(cells) == len(header):
-            rows.append(cells)
-    return pd.DataFrame(rows, columns=header)
+        if len(cells) == n_cols:
+            for i, cell in enumerate(cells):
+                cols[i].append(cell)
+    return pd.DataFrame({h: cols[i] for i, h in enumerate(header)}, copy=False)
 
 
-@st.cache_data
+@st.cache_data(ttl=60, show_spinner=False)
 def load_chapters():
     """output/ 디렉토리에서 장 목록 로딩"""
-    chapters = {}
-    for name in sorted(os.listdir(OUTPUT_DIR)):
-        path = os.path.join(OUTPUT_DIR, name)
-        if os.path.isdir(path):
-            chapters[name] = path
-    return chapters
+    # scandir는 DirEntry에 stat 정보를 캐시하므로 엔트리별 isdir syscall이 없음
+    with os.scandir(OUTPUT_DIR) as entries:
+        return {
+            e.name: e.path
+            for e in sorted(entries, key=lambda e: e.name)
+            if e.is_dir()
+        }
 
 
-@st.cache_data
+@st.cache_data(ttl=60, show_spinner=False)
 def load_specialties():
     """제3장 하위 전공 목록 로딩"""
     ch3_dir = os.path.join(OUTPUT_DIR, "제3장_레지던트_연차별_수련_교과과정")
     if not os.path.isdir(ch3_dir):
         return {}
     specs = {}
-    for name in sorted(os.listdir(ch3_dir), key=lambda x: int(re.match(r"(\d+)", x).group(1)) if re.match(r"(\d+)", x) else 999):
-        path = os.path.join(ch3_dir, name, "main")
+    with os.scandir(ch3_dir) as entries:
+        sorted_entries = sorted(
+            (e for e in entries if e.is_dir()),
+            key=lambda e: _spec_sort_key(e.name),
+        )
+    for entry in sorted_entries:
+        path = os.path.join(entry.path, "main")
         if os.path.isdir(path):
-            specs[name] = path
+            specs[entry.name] = path
     return specs
 
 
-@st.cache_data
-def read_md_file(path: str) -> str:
+@st.cache_data(show_spinner=False)
+def _read_md_file_cached(path: str, mtime: float) -> str:
     with open(path, encoding="utf-8") as f:
         return f.read()
 
 
+def read_md_file(path: str) -> str:
+    # mtime을 캐시 키에 포함해 파일이 바뀌면 자동으로 캐시 무효화
+    return _read_md_file_cached(path, os.path.getmtime(path))
+
+
 @st.cache_data
 def df_to_colored_html(df: pd.DataFrame, year_filter: str = "전체") -> str:
     """DataFrame을 구분별 색상이 적용된 HTML 테이블로 변환"""
@@ -97,51 +128,52 @@ def df_to_colored_html(df: pd.DataFrame, year_filter: str = "전체") -> str:
         if df.empty:
             return "<p>해당 연차 데이터가 없습니다.</p>"
 
-    html = """<table style="width:100%; border-collapse:collapse; font-size:14px;">
+    # 누적 문자열 += 대신 조각 리스트를 모아 마지막에 한 번만 join
+    parts = [
+        """<table style="width:100%; border-collapse:collapse; font-size:14px;">
     <thead><tr style="background:#1a237e; color:white;">
         <th style="padding:8px; border:1px solid #ccc; width:8%;">연차</th>
         <th style="padding:8px; border:1px solid #ccc; width:14%;">구분</th>
         <th style="padding:8px; border:1px solid #ccc; width:78%;">내용</th>
     </tr></thead><tbody>"""
-
-    prev_year = None
-    prev_cat = None
-    for _, row in df.iterrows():
-        year_val = str(row[col_year]).strip()
-        cat_val = str(row[col_cat]).strip()
-        content_val = str(row[col_content]).strip()
-        bg = get_category_color(cat_val)
-
-        # 연차/구분이 이전과 같으면 빈칸 표시
-        show_year = year_val if year_val != prev_year else ""
-        show_cat = cat_val if (year_val != prev_year or cat_val != prev_cat) else ""
-        prev_year = year_val
-        prev_cat = cat_val
-
-        # 내용의 줄바꿈 처리
+    ]
+
+    # 연차/구분이 직전 행과 같으면 빈칸 표시 (shift 비교로 벡터 처리)
+    years = df[col_year].astype(str).str.strip()
+    cats = df[col_cat].astype(str).str.strip()
+    contents = df[col_content].astype(str).str.strip()
+
+    year_changed = years != years.shift()
+    show_years = years.where(year_changed, "")
+    show_cats = cats.where(year_changed | (cats != cats.shift()), "")
+    bgs = cats.map(get_category_color)
+
+    # 루프에서는 문자열 포맷만 수행
+    for show_year, show_cat, content_val, bg in zip(
+        show_years, show_cats, contents, bgs
+    ):
         content_html = content_val.replace("\n", "<br>")
-
-        html += f"""<tr style="background:{bg};">
+        parts.append(f"""<tr style="background:{bg};">
             <td style="padding:6px 8px; border:1px solid #ddd; font-weight:bold; vertical-align:top;">{show_year}</td>
             <td style="padding:6px 8px; border:1px solid #ddd; vertical-align:top;">{show_cat}</td>
             <td style="padding:6px 8px; border:1px solid #ddd; white-space:pre-wrap;">{content_html}</td>
-        </tr>"""
+        </tr>""")
 
-    html += "</tbody></table>"
-    return html
+    parts.append("</tbody></table>")
+    return "".join(parts)
 
 
 def render_chapter_content(chapter_path: str):
     """부칙/총칙/인턴수련 장의 마크다운 콘텐츠 렌더링"""
-    for fname in sorted(os.listdir(chapter_path)):
-        if fname.endswith(".md"):
-            content = read_md_file(os.path.join(chapter_path, fname))
-            st.markdown(content)
+    with os.scandir(chapter_path) as entries:
+        md_files = sorted(e.path for e in entries if e.name.endswith(".md"))
+    for path in md_files:
+        st.markdown(read_md_file(path))
 
 
 def render_specialty(spec_path: str, spec_name: str):
     """전공 상세 페이지 렌더링"""
-    display_name = re.sub(r"^\d+\.", "", spec_name)
+    display_name = _RE_SPEC_PREFIX.sub("", spec_name)
     st.header(f"🏥 {display_name}")
 
     # 교육목표
@@ -149,7 +181,7 @@ def render_specialty(spec_path: str, spec_name: str):
     if os.path.exists(goal_path):
         goal_text = read_md_file(goal_path)
         # 제목 줄 제거하고 본문만 추출
-        goal_body = re.sub(r"^#.*\n+", "", goal_text).strip()
+        goal_body = _RE_MD_HEADING.sub("", goal_text).strip()
         st.info(f"**교육목표**\n\n{goal_body}")
 
     # 연차별 교과과정
@@ -179,14 +211,15 @@ def render_specialty(spec_path: str, spec_name: str):
             st.markdown(html, unsafe_allow_html=True)
 
     # 첨부 테이블 (table_2.md, table_3.md 등)
-    extra_tables = sorted(
-        f for f in os.listdir(spec_path) if re.match(r"table_\d+\.md", f)
-    )
+    with os.scandir(spec_path) as entries:
+        extra_tables = sorted(
+            e.name for e in entries if _RE_TABLE_FILE.match(e.name)
+        )
     for tfile in extra_tables:
         tpath = os.path.join(spec_path, tfile)
         tcontent = read_md_file(tpath)
         tdf = parse_md_table(tcontent)
-        table_title = re.search(r"^# (.+)", tcontent)
+        table_title = _RE_MD_TITLE.search(tcontent)
         title = table_title.group(1) if table_title else tfile.replace(".md", "")
         st.subheader(f"📎 {title}")
         if tdf is not None:
@@ -219,7 +252,7 @@ def render_browse_tab():
     if selected_chapter == "제3장_레지던트_연차별_수련_교과과정":
         st.sidebar.markdown("---")
         spec_names = list(specialties.keys())
-        spec_labels = [re.sub(r"^\d+\.", "", s) for s in spec_names]
+        spec_labels = [_RE_SPEC_PREFIX.sub("", s) for s in spec_names]
         selected_spec_idx = st.sidebar.selectbox(
             "전공 선택",
             range(len(spec_names)),
@@ -318,7 +351,7 @@ def render_chat_tab():
                     response_placeholder.error(full_response)
 
                 # 출처 표시
-                source_info = [r["metadata"] for r in results]
+                source_info = [r.metadata for r in results]
                 if source_info:
                     with st.expander("참고 자료"):
                         for s in source_info:
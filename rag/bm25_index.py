@@ -1,74 +1,238 @@
+import math
 import os
-import pickle
 import re
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from multiprocessing import Pool
 
-from rank_bm25 import BM25Okapi
+import numpy as np
 
 from .config import BM25_PERSIST_PATH
 
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@dataclass(slots=True)
+class RetrievedItem:
+    """검색 결과 한 건 — dict 대비 슬롯 기반 속성 접근과 작은 메모리 풋프린트"""
+
+    id: str
+    text: str
+    metadata: dict
+    distance: float = 0.0
+    bm25_score: float = 0.0
+
+
+# BM25 Okapi 파라미터 (rank_bm25 기본값과 동일)
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_BM25_EPSILON = 0.25
+
 
 def _tokenize(text: str) -> list[str]:
     """한국어 + 영숫자 토큰화 (공백/구두점 기준 분리)"""
-    return re.findall(r"\w+", text.lower())
+    return _TOKEN_RE.findall(text.lower())
 
 
-def _match_filter(metadata: dict, where_filter: dict) -> bool:
-    """ChromaDB where 필터 형식으로 메타데이터 매칭 확인.
+def _iter_filter_conditions(where_filter: dict):
+    """ChromaDB where 필터를 (field, value) 조건 목록으로 평탄화.
 
     지원 형식:
       - 단일 필드: {"field": "value"}
       - 복합 $and: {"$and": [{"field1": "val1"}, {"field2": "val2"}]}
     """
-    if "$and" in where_filter:
-        return all(_match_filter(metadata, cond) for cond in where_filter["$and"])
-
     for key, value in where_filter.items():
-        if key.startswith("$"):
-            continue
-        if metadata.get(key) != value:
-            return False
-    return True
+        if key == "$and":
+            for cond in value:
+                yield from _iter_filter_conditions(cond)
+        elif not key.startswith("$"):
+            yield key, value
 
 
 class BM25Index:
-    """BM25 키워드 검색 인덱스 (pickle 기반 영속화)"""
+    """BM25 키워드 검색 인덱스 (npz 컬럼 기반 영속화)
+
+    스코어러는 NumPy 포스팅 리스트 기반: 빌드 시 토큰별 (문서 인덱스, BM25
+    가중치) 배열을 미리 계산해 두고, 쿼리 시에는 토큰별 배열 덧셈만 수행한다.
+    (rank_bm25의 파이썬 텀 루프 대비 벡터 연산으로 처리)
+    """
 
     def __init__(self, persist_path: str):
         self.persist_path = persist_path
-        self.bm25: BM25Okapi | None = None
         self.doc_ids: list[str] = []
         self.doc_texts: list[str] = []
         self.doc_metadatas: list[dict] = []
         self.tokenized_corpus: list[list[str]] = []
+        # 토큰 -> (doc 인덱스 배열, BM25 가중치 배열)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] | None = None
+        # 메타데이터 필드 -> 문서별 값 배열 (필터를 벡터 비교로 처리하기 위한 SoA)
+        self._meta_cols: dict[str, np.ndarray] = {}
 
     def build(self, chunks: list[dict]) -> None:
         self.doc_ids = [c["id"] for c in chunks]
         self.doc_texts = [c["text"] for c in chunks]
         self.doc_metadatas = [c["metadata"] for c in chunks]
-        self.tokenized_corpus = [_tokenize(c["text"]) for c in chunks]
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        # 토큰화는 청크별로 독립적인 CPU-bound 작업이라 코어 단위로 분산
+        with Pool() as pool:
+            self.tokenized_corpus = pool.map(
+                _tokenize, (c["text"] for c in chunks), chunksize=256
+            )
+        self._build_scorer()
+        self._build_meta_cols()
+
+    def _build_meta_cols(self) -> None:
+        """메타데이터를 필드별 열 배열로 변환 (문서 단위 dict 조회 제거)"""
+        keys = set()
+        for metadata in self.doc_metadatas:
+            keys.update(metadata)
+        self._meta_cols = {
+            key: np.array(
+                [m.get(key) for m in self.doc_metadatas], dtype=object
+            )
+            for key in keys
+        }
+
+    def _filter_mask(self, where_filter: dict) -> np.ndarray:
+        """where 필터를 필드별 벡터 비교로 평가한 문서 마스크 반환"""
+        mask = np.ones(len(self.doc_ids), dtype=bool)
+        for key, value in _iter_filter_conditions(where_filter):
+            col = self._meta_cols.get(key)
+            if col is None:
+                if value is not None:
+                    mask[:] = False
+                continue
+            mask &= col == value
+        return mask
+
+    def _build_scorer(self) -> None:
+        """토큰별 BM25 가중치 포스팅 리스트 사전 계산 (Okapi, rank_bm25와 동일 수식)"""
+        n_docs = len(self.tokenized_corpus)
+        if n_docs == 0:
+            self._postings = {}
+            return
+
+        doc_freqs = [Counter(tokens) for tokens in self.tokenized_corpus]
+        doc_lens = np.array([len(tokens) for tokens in self.tokenized_corpus])
+        avgdl = doc_lens.mean() or 1.0
+
+        # idf 계산 (음수 idf는 epsilon * 평균 idf로 보정 — BM25Okapi와 동일)
+        df = Counter()
+        for freq in doc_freqs:
+            df.update(freq.keys())
+        idf = {
+            token: math.log(n_docs - count + 0.5) - math.log(count + 0.5)
+            for token, count in df.items()
+        }
+        avg_idf = sum(idf.values()) / len(idf)
+        eps = _BM25_EPSILON * avg_idf
+        for token, value in idf.items():
+            if value < 0:
+                idf[token] = eps
+
+        # 문서 길이 정규화 분모는 문서별로 고정이므로 한 번만 계산
+        denom_base = _BM25_K1 * (1 - _BM25_B + _BM25_B * doc_lens / avgdl)
+
+        postings: dict[str, tuple[list[int], list[float]]] = {}
+        for doc_idx, freq in enumerate(doc_freqs):
+            base = denom_base[doc_idx]
+            for token, tf in freq.items():
+                weight = idf[token] * tf * (_BM25_K1 + 1) / (tf + base)
+                entry = postings.setdefault(token, ([], []))
+                entry[0].append(doc_idx)
+                entry[1].append(weight)
+
+        self._postings = {
+            token: (
+                np.array(doc_idxs, dtype=np.int32),
+                np.array(weights, dtype=np.float32),
+            )
+            for token, (doc_idxs, weights) in postings.items()
+        }
+
+    def get_scores(self, tokenized_query: list[str]) -> np.ndarray:
+        """쿼리 토큰별 포스팅 리스트 덧셈으로 전체 문서 점수 계산"""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for token in tokenized_query:
+            posting = self._postings.get(token)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
 
     def save(self) -> None:
         os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
-        data = {
-            "doc_ids": self.doc_ids,
-            "doc_texts": self.doc_texts,
-            "doc_metadatas": self.doc_metadatas,
-            "tokenized_corpus": self.tokenized_corpus,
+
+        # 토큰 corpus는 (vocab, flat 토큰 id, offset) 컬럼 구조로 직렬화
+        # (list[list[str]] pickle 대비 파일이 작고 로드 시 객체 재구성이 없음)
+        vocab: dict[str, int] = {}
+        token_ids: list[int] = []
+        offsets = [0]
+        for tokens in self.tokenized_corpus:
+            token_ids.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+            offsets.append(len(token_ids))
+
+        arrays = {
+            "ids": np.array(self.doc_ids),
+            "texts": np.array(self.doc_texts),
+            "vocab": np.array(list(vocab)),
+            "token_ids": np.array(token_ids, dtype=np.int32),
+            "token_offsets": np.array(offsets, dtype=np.int64),
         }
-        with open(self.persist_path, "wb") as f:
-            pickle.dump(data, f)
+        # 메타데이터 컬럼은 빈 필드가 생략된 청크에서 None 구멍이 생기므로
+        # (object 배열은 pickle 없이 저장 불가) 타입에 맞는 채움값 + 결측
+        # 마스크 쌍으로 직렬화한다
+        for key, col in self._meta_cols.items():
+            values = col.tolist()
+            isnull = np.array([v is None for v in values], dtype=bool)
+            if isnull.any():
+                filler = ""
+                for v in values:
+                    if v is not None:
+                        filler = type(v)()  # str -> "", int -> 0
+                        break
+                values = [filler if v is None else v for v in values]
+            arrays[f"meta_{key}"] = np.array(values)
+            arrays[f"meta_{key}_isnull"] = isnull
+
+        np.savez_compressed(self.persist_path, **arrays)
 
     def load(self) -> bool:
         if not os.path.exists(self.persist_path):
             return False
-        with open(self.persist_path, "rb") as f:
-            data = pickle.load(f)
-        self.doc_ids = data["doc_ids"]
-        self.doc_texts = data["doc_texts"]
-        self.doc_metadatas = data["doc_metadatas"]
-        self.tokenized_corpus = data["tokenized_corpus"]
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        with np.load(self.persist_path, allow_pickle=False) as data:
+            self.doc_ids = data["ids"].tolist()
+            self.doc_texts = data["texts"].tolist()
+
+            vocab = data["vocab"]
+            token_ids = data["token_ids"]
+            offsets = data["token_offsets"]
+            self.tokenized_corpus = [
+                vocab[token_ids[start:end]].tolist()
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+
+            self._meta_cols = {}
+            for name in data.files:
+                if not name.startswith("meta_") or name.endswith("_isnull"):
+                    continue
+                key = name[len("meta_"):]
+                col = np.array(data[name].tolist(), dtype=object)
+                mask_name = f"{name}_isnull"
+                if mask_name in data.files:
+                    col[data[mask_name]] = None
+                self._meta_cols[key] = col
+
+        # 문서 단위 메타데이터 dict는 열 배열에서 복원 (결측 필드는 생략)
+        keys = list(self._meta_cols)
+        self.doc_metadatas = []
+        for i in range(len(self.doc_ids)):
+            metadata = {}
+            for key in keys:
+                value = self._meta_cols[key][i]
+                if value is not None:
+                    metadata[key] = value
+            self.doc_metadatas.append(metadata)
+        self._build_scorer()
         return True
 
     def is_built(self) -> bool:
@@ -76,46 +240,74 @@ class BM25Index:
 
     def query(
         self, question: str, top_k: int, where_filter: dict | None = None
-    ) -> list[dict]:
-        if self.bm25 is None:
+    ) -> list[RetrievedItem]:
+        if self._postings is None:
             return []
 
         tokenized_query = _tokenize(question)
         if not tokenized_query:
             return []
 
-        scores = self.bm25.get_scores(tokenized_query)
+        scores = self.get_scores(tokenized_query)
 
-        candidates = []
-        for idx, score in enumerate(scores):
-            if score <= 0:
-                continue
-            if where_filter and not _match_filter(
-                self.doc_metadatas[idx], where_filter
-            ):
-                continue
-            candidates.append((idx, score))
+        # 필터 미통과 문서는 0점 처리 (0점 이하는 아래에서 결과 제외)
+        if where_filter:
+            scores = np.where(self._filter_mask(where_filter), scores, 0.0)
 
-        candidates.sort(key=lambda x: x[1], reverse=True)
+        # 안정 정렬로 상위 top_k 선택 — 참조 해결로 본문이 복제된 청크는
+        # 점수가 정확히 같아지므로, 동점 시 문서 인덱스 오름차순(기존 파이썬
+        # 정렬과 동일)을 경계 선택까지 보장해야 한다
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        top_idx = np.argsort(-scores, kind="stable")[:top_k]
 
         return [
-            {
-                "id": self.doc_ids[idx],
-                "text": self.doc_texts[idx],
-                "metadata": self.doc_metadatas[idx],
-                "bm25_score": float(score),
-            }
-            for idx, score in candidates[:top_k]
+            RetrievedItem(
+                id=self.doc_ids[idx],
+                text=self.doc_texts[idx],
+                metadata=self.doc_metadatas[idx],
+                bm25_score=float(scores[idx]),
+            )
+            for idx in top_idx
+            if scores[idx] > 0
         ]
 
 
 # ── 모듈 레벨 싱글턴 ──
 
 _bm25_instance: BM25Index | None = None
+_cached_loader = None
+
+
+def _get_streamlit_loader():
+    """Streamlit이 이미 로드된 프로세스에서만 cache_resource 로더 생성.
+
+    st.cache_resource는 rerun 간에 로드된 인덱스를 유지하고,
+    mtime을 키에 넣어 재빌드 시 자동 무효화된다.
+    (CLI 경로에서 streamlit을 import하지 않도록 sys.modules로만 확인)
+    """
+    global _cached_loader
+    if _cached_loader is None:
+        st = sys.modules.get("streamlit")
+        if st is None:
+            return None
+
+        @st.cache_resource(show_spinner=False)
+        def _load_cached(path: str, mtime: float) -> BM25Index:
+            index = BM25Index(path)
+            index.load()
+            return index
+
+        _cached_loader = _load_cached
+    return _cached_loader
 
 
 def get_bm25_index() -> BM25Index:
     global _bm25_instance
+    loader = _get_streamlit_loader()
+    if loader is not None and os.path.exists(BM25_PERSIST_PATH):
+        return loader(BM25_PERSIST_PATH, os.path.getmtime(BM25_PERSIST_PATH))
     if _bm25_instance is None:
         _bm25_instance = BM25Index(BM25_PERSIST_PATH)
         _bm25_instance.load()
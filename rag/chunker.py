@@ -1,16 +1,32 @@
+import io
 import os
 import re
-
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 from .config import OUTPUT_DIR
 
+# 청크 생성 루프에서 반복 사용되는 정규식은 모듈 레벨에서 한 번만 컴파일
+_FOLDER_RE = re.compile(r"(\d+)\.(.+)")
+_YEAR_REF_RE = re.compile(r"(\d)년차와\s*(?:동일|공통)")
+_TOTAL_REF_RE = re.compile(r"총계.*참조")
+
 
 def normalize_category(raw: str) -> str:
     return raw.replace(" ", "").strip()
 
 
-def parse_md_table(text: str) -> pd.DataFrame | None:
+def _strip_md_header(text: str) -> str:
+    """선두의 '# 제목' 줄을 제거하고 본문만 반환 (정규식 없이 한 번의 스캔)"""
+    if not text.startswith("#"):
+        return text.strip()
+    newline = text.find("\n")
+    if newline == -1:
+        return text.strip()
+    return text[newline + 1 :].strip()
+
+
+def parse_md_table(text: str) -> tuple[list[str], list[list[str]]] | None:
+    """마크다운 테이블을 (헤더, 행 리스트)로 파싱 (테이블 없으면 None)"""
     lines = [l for l in text.strip().splitlines() if l.startswith("|")]
     if len(lines) < 3:
         return None
@@ -20,23 +36,38 @@ def parse_md_table(text: str) -> pd.DataFrame | None:
         cells = [c.strip() for c in line.split("|")[1:-1]]
         if len(cells) == len(header):
             rows.append(cells)
-    return pd.DataFrame(rows, columns=header)
+    return header, rows
 
 
 def _ffill_md_table(body: str) -> str:
     """마크다운 테이블의 빈 셀을 forward fill하여 반환 (테이블 없으면 원본 반환)"""
-    df = parse_md_table(body)
-    if df is None:
+    parsed = parse_md_table(body)
+    if parsed is None:
         return body
-    if not (df == "").any().any():
+    header, rows = parsed
+    if not any("" in row for row in rows):
         return body
-    df = df.replace("", pd.NA).ffill().fillna("")
-    header = "| " + " | ".join(df.columns) + " |"
-    sep = "| " + " | ".join("---" for _ in df.columns) + " |"
-    rows = []
-    for _, row in df.iterrows():
-        rows.append("| " + " | ".join(str(v) for v in row) + " |")
-    return "\n".join([header, sep] + rows)
+    # 열별 마지막 값을 유지하며 빈 셀을 제자리에서 채움
+    last = [""] * len(header)
+    for row in rows:
+        for i, cell in enumerate(row):
+            if cell:
+                last[i] = cell
+            else:
+                row[i] = last[i]
+    out = ["| " + " | ".join(header) + " |"]
+    out.append("| " + " | ".join("---" for _ in header) + " |")
+    out.extend("| " + " | ".join(row) + " |" for row in rows)
+    return "\n".join(out)
+
+
+def _metadata(**fields) -> dict:
+    """청크 메타데이터 생성: 빈 값("", 0)은 저장하지 않음.
+
+    조회 측(retriever/dashboard)은 전부 .get()으로 접근하므로 빈 필드를
+    생략해도 동작이 같고, Chroma/BM25로 직렬화되는 바이트만 줄어든다.
+    """
+    return {k: v for k, v in fields.items() if v != "" and v != 0}
 
 
 def _read_md(path: str) -> str:
@@ -46,7 +77,7 @@ def _read_md(path: str) -> str:
 
 def _extract_specialty_info(folder_name: str) -> tuple[str, int]:
     """'1.내과' -> ('내과', 1)"""
-    m = re.match(r"(\d+)\.(.+)", folder_name)
+    m = _FOLDER_RE.match(folder_name)
     if m:
         return m.group(2), int(m.group(1))
     return folder_name, 0
@@ -54,22 +85,19 @@ def _extract_specialty_info(folder_name: str) -> tuple[str, int]:
 
 def chunk_general_document(file_path: str, doc_type: str) -> list[dict]:
     text = _read_md(file_path)
-    body = re.sub(r"^#.*\n+", "", text).strip()
+    body = _strip_md_header(text)
     if not body:
         return []
+    rel_path = os.path.relpath(file_path, OUTPUT_DIR)
     return [
         {
             "id": doc_type,
             "text": f"[{doc_type}]\n{body}",
-            "metadata": {
-                "doc_type": doc_type,
-                "specialty": "",
-                "specialty_id": 0,
-                "year": "",
-                "category": "",
-                "chunk_level": "document",
-                "source_file": os.path.relpath(file_path, OUTPUT_DIR),
-            },
+            "metadata": _metadata(
+                doc_type=doc_type,
+                chunk_level="document",
+                source_file=rel_path,
+            ),
         }
     ]
 
@@ -78,22 +106,21 @@ def chunk_education_goal(
     file_path: str, specialty: str, specialty_id: int
 ) -> list[dict]:
     text = _read_md(file_path)
-    body = re.sub(r"^#.*\n+", "", text).strip()
+    body = _strip_md_header(text)
     if not body:
         return []
+    rel_path = os.path.relpath(file_path, OUTPUT_DIR)
     return [
         {
             "id": f"{specialty}_교육목표",
             "text": f"[{specialty}] 교육목표:\n{body}",
-            "metadata": {
-                "doc_type": "교육목표",
-                "specialty": specialty,
-                "specialty_id": specialty_id,
-                "year": "",
-                "category": "",
-                "chunk_level": "document",
-                "source_file": os.path.relpath(file_path, OUTPUT_DIR),
-            },
+            "metadata": _metadata(
+                doc_type="교육목표",
+                specialty=specialty,
+                specialty_id=specialty_id,
+                chunk_level="document",
+                source_file=rel_path,
+            ),
         }
     ]
 
@@ -102,57 +129,75 @@ def chunk_curriculum_table(
     file_path: str, specialty: str, specialty_id: int
 ) -> list[dict]:
     text = _read_md(file_path)
-    df = parse_md_table(text)
-    if df is None or df.empty:
+    parsed = parse_md_table(text)
+    if parsed is None or not parsed[1]:
         return []
-
-    col_year, col_cat, col_content = df.columns[0], df.columns[1], df.columns[2]
+    _, rows = parsed
+    # 한 파일에서 수십 개 청크가 나오므로 relpath/전공 태그는 한 번만 계산
+    rel_path = os.path.relpath(file_path, OUTPUT_DIR)
+    spec_tag = f"[{specialty}]"
 
     # forward fill: 연차는 항상, 구분은 같은 연차 그룹 내에서만
-    df[col_year] = df[col_year].replace("", pd.NA).ffill().fillna("")
-    df[col_cat] = df[col_cat].replace("", pd.NA)
-    df[col_cat] = df.groupby(col_year)[col_cat].ffill().fillna("")
+    last_year = ""
+    last_cat_by_year: dict[str, str] = {}
+    for row in rows:
+        if row[0]:
+            last_year = row[0]
+        else:
+            row[0] = last_year
+        if row[1]:
+            last_cat_by_year[row[0]] = row[1]
+        else:
+            row[1] = last_cat_by_year.get(row[0], "")
 
     chunks = []
 
+    # (연차, 구분) 단위 그룹 (첫 등장 순서 유지 — groupby(sort=False)와 동일)
+    year_cat_groups: dict[tuple[str, str], list[str]] = {}
+    for row in rows:
+        year_cat_groups.setdefault((row[0], row[1]), []).append(row[2])
+
     # (연차, 구분) 단위 청크
-    for (year, cat_raw), group in df.groupby([col_year, col_cat], sort=False):
+    for (year, cat_raw), contents in year_cat_groups.items():
         cat = normalize_category(cat_raw)
-        lines = [line for line in group[col_content].tolist() if line.strip()]
-        content_parts = []
+        lines = [line for line in contents if line.strip()]
+        # 리스트 누적 + join 대신 StringIO 버퍼에 바로 기록
+        buf = io.StringIO()
         for i, line in enumerate(lines):
             stripped = line.strip()
             is_section_tag = stripped.startswith("<") and stripped.endswith(">")
             # 섹션 태그 앞에 빈 줄 추가 (첫 줄 제외)
-            if is_section_tag and content_parts:
-                content_parts.append("")
-            content_parts.append(line)
+            if is_section_tag and i > 0:
+                buf.write("\n")
+            if i > 0:
+                buf.write("\n")
+            buf.write(line)
             # 섹션 태그 뒤에도 빈 줄 추가 (마지막 줄 제외)
             if is_section_tag and i < len(lines) - 1:
-                content_parts.append("")
-        content = "\n".join(content_parts)
+                buf.write("\n")
+        content = buf.getvalue()
         if not content.strip():
             continue
 
         # "동일" 참조 해결은 나중에 한꺼번에 처리
         chunk_id = f"{specialty}_{year}_{cat}"
         if year in ("총계", "비고"):
-            header = f"[{specialty}] {year} - {cat}:" if cat else f"[{specialty}] {year}:"
+            header = f"{spec_tag} {year} - {cat}:" if cat else f"{spec_tag} {year}:"
         else:
-            header = f"[{specialty}] {year}년차 - {cat}:"
+            header = f"{spec_tag} {year}년차 - {cat}:"
         chunks.append(
             {
                 "id": chunk_id,
                 "text": f"{header}\n{content}",
-                "metadata": {
-                    "doc_type": "연차별_교과과정",
-                    "specialty": specialty,
-                    "specialty_id": specialty_id,
-                    "year": str(year),
-                    "category": cat,
-                    "chunk_level": "year_category",
-                    "source_file": os.path.relpath(file_path, OUTPUT_DIR),
-                },
+                "metadata": _metadata(
+                    doc_type="연차별_교과과정",
+                    specialty=specialty,
+                    specialty_id=specialty_id,
+                    year=str(year),
+                    category=cat,
+                    chunk_level="year_category",
+                    source_file=rel_path,
+                ),
             }
         )
 
@@ -162,58 +207,94 @@ def chunk_curriculum_table(
         body = chunk["text"].split("\n", 1)[-1].strip()
         if len(body) > 30:
             continue
+        # 참조 문구가 아예 없는 짧은 본문은 정규식 없이 바로 건너뜀
+        if "년차와" not in body and "총계" not in body:
+            continue
         header = chunk["text"].split("\n", 1)[0]
 
         # "N년차와 동일/공통" 참조
-        m = re.search(r"(\d)년차와\s*(?:동일|공통)", body)
+        m = _YEAR_REF_RE.search(body)
         if m:
-            ref_id = f"{specialty}_{m.group(1)}_{chunk['metadata']['category']}"
+            ref_id = f"{specialty}_{m.group(1)}_{chunk['metadata'].get('category', '')}"
             if ref_id in chunk_map:
                 ref_text = chunk_map[ref_id]["text"].split("\n", 1)[-1]
                 chunk["text"] = f"{header}\n{ref_text}"
             continue
 
         # "총계 참조" / "총계 항목 참조" 등
-        if re.search(r"총계.*참조", body):
-            ref_id = f"{specialty}_총계_{chunk['metadata']['category']}"
+        if _TOTAL_REF_RE.search(body):
+            ref_id = f"{specialty}_총계_{chunk['metadata'].get('category', '')}"
             if ref_id in chunk_map:
                 ref_text = chunk_map[ref_id]["text"].split("\n", 1)[-1]
                 chunk["text"] = f"{header}\n{ref_text}"
 
     # 연차별 요약 청크 (비고는 구분 없이 단일 청크이므로 요약 생략)
-    for year, group in df.groupby(col_year, sort=False):
+    year_groups: dict[str, list[list[str]]] = {}
+    for row in rows:
+        year_groups.setdefault(row[0], []).append(row)
+
+    for year, group_rows in year_groups.items():
         if year == "비고":
             continue
         lines = []
-        for _, row in group.iterrows():
-            cat = normalize_category(str(row[col_cat]))
-            content = str(row[col_content]).strip()
+        for row in group_rows:
+            cat = normalize_category(row[1])
+            content = row[2].strip()
             if content:
                 lines.append(f"[{cat}] {content}" if cat else content)
         if not lines:
             continue
-        header = f"[{specialty}] {year}년차 전체:" if year not in ("총계",) else f"[{specialty}] {year} 전체:"
+        header = f"{spec_tag} {year}년차 전체:" if year not in ("총계",) else f"{spec_tag} {year} 전체:"
         chunks.append(
             {
                 "id": f"{specialty}_{year}_전체",
                 "text": f"{header}\n" + "\n".join(lines),
-                "metadata": {
-                    "doc_type": "연차별_교과과정",
-                    "specialty": specialty,
-                    "specialty_id": specialty_id,
-                    "year": str(year),
-                    "category": "전체",
-                    "chunk_level": "year",
-                    "source_file": os.path.relpath(file_path, OUTPUT_DIR),
-                },
+                "metadata": _metadata(
+                    doc_type="연차별_교과과정",
+                    specialty=specialty,
+                    specialty_id=specialty_id,
+                    year=str(year),
+                    category="전체",
+                    chunk_level="year",
+                    source_file=rel_path,
+                ),
             }
         )
 
     return chunks
 
 
+def chunk_attachment(
+    file_path: str, fname: str, specialty: str, specialty_id: int
+) -> list[dict]:
+    """첨부 파일(별지) 하나를 단일 청크로 변환"""
+    text = _read_md(file_path)
+    body = _strip_md_header(text)
+    if "지부 집담회" in fname:
+        body = _ffill_md_table(body)
+    if not body:
+        return []
+    rel_path = os.path.relpath(file_path, OUTPUT_DIR)
+    return [
+        {
+            "id": f"{specialty}_첨부_{fname}",
+            "text": f"[{specialty}] 별지(첨부자료) - {fname.replace('.md', '')}:\n{body}",
+            "metadata": _metadata(
+                doc_type="첨부",
+                specialty=specialty,
+                specialty_id=specialty_id,
+                chunk_level="document",
+                source_file=rel_path,
+            ),
+        }
+    ]
+
+
 def generate_all_chunks() -> list[dict]:
-    chunks = []
+    # 디렉토리를 먼저 훑어 (청커, 인자) 작업 목록을 만들고,
+    # 파일 읽기가 대부분인 청킹은 스레드 풀에서 병렬 실행
+    # (제출 순서대로 결과를 이어 붙여 청크 순서는 순차 실행과 동일)
+    tasks = []
 
     # 부칙/총칙/인턴수련
     general_docs = {
@@ -225,57 +306,56 @@ def generate_all_chunks() -> list[dict]:
     }
     for doc_type, path in general_docs.items():
         if os.path.exists(path):
-            chunks.extend(chunk_general_document(path, doc_type))
+            tasks.append((chunk_general_document, (path, doc_type)))
 
     # 제3장 전공별
     ch3_dir = os.path.join(OUTPUT_DIR, "제3장_레지던트_연차별_수련_교과과정")
-    if not os.path.isdir(ch3_dir):
-        return chunks
-
-    for folder in sorted(os.listdir(ch3_dir)):
-        main_dir = os.path.join(ch3_dir, folder, "main")
-        if not os.path.isdir(main_dir):
-            continue
+    if os.path.isdir(ch3_dir):
+        with os.scandir(ch3_dir) as entries:
+            folders = sorted(e.name for e in entries if e.is_dir())
+
+        for folder in folders:
+            spec_dir = os.path.join(ch3_dir, folder)
+            main_dir = os.path.join(spec_dir, "main")
+            if not os.path.isdir(main_dir):
+                continue
+
+            specialty, spec_id = _extract_specialty_info(folder)
+
+            # 교육목표
+            goal_path = os.path.join(main_dir, "교육목표.md")
+            if os.path.exists(goal_path):
+                tasks.append((chunk_education_goal, (goal_path, specialty, spec_id)))
+
+            # 연차별 교과과정
+            table_path = os.path.join(main_dir, "연차별_교과과정.md")
+            if os.path.exists(table_path):
+                tasks.append((chunk_curriculum_table, (table_path, specialty, spec_id)))
+
+            # 첨부 파일 (attachment/ 또는 attachments/ 폴더)
+            with os.scandir(spec_dir) as entries:
+                attachment_dirs = sorted(
+                    e.path
+                    for e in entries
+                    if e.is_dir() and e.name.startswith("attachment")
+                )
+            for sub_path in attachment_dirs:
+                with os.scandir(sub_path) as entries:
+                    md_files = sorted(
+                        e.name for e in entries if e.name.endswith(".md")
+                    )
+                for fname in md_files:
+                    fpath = os.path.join(sub_path, fname)
+                    tasks.append((chunk_attachment, (fpath, fname, specialty, spec_id)))
+
+    if not tasks:
+        return []
 
-        specialty, spec_id = _extract_specialty_info(folder)
-
-        # 교육목표
-        goal_path = os.path.join(main_dir, "교육목표.md")
-        if os.path.exists(goal_path):
-            chunks.extend(chunk_education_goal(goal_path, specialty, spec_id))
-
-        # 연차별 교과과정
-        table_path = os.path.join(main_dir, "연차별_교과과정.md")
-        if os.path.exists(table_path):
-            chunks.extend(chunk_curriculum_table(table_path, specialty, spec_id))
-
-        # 첨부 파일 (attachment/ 또는 attachments/ 폴더)
-        spec_dir = os.path.join(ch3_dir, folder)
-        for sub in os.listdir(spec_dir):
-            sub_path = os.path.join(spec_dir, sub)
-            if os.path.isdir(sub_path) and sub.startswith("attachment"):
-                for fname in sorted(os.listdir(sub_path)):
-                    if fname.endswith(".md"):
-                        fpath = os.path.join(sub_path, fname)
-                        text = _read_md(fpath)
-                        body = re.sub(r"^#.*\n+", "", text).strip()
-                        if "지부 집담회" in fname:
-                            body = _ffill_md_table(body)
-                        if body:
-                            chunks.append(
-                                {
-                                    "id": f"{specialty}_첨부_{fname}",
-                                    "text": f"[{specialty}] 별지(첨부자료) - {fname.replace('.md', '')}:\n{body}",
-                                    "metadata": {
-                                        "doc_type": "첨부",
-                                        "specialty": specialty,
-                                        "specialty_id": spec_id,
-                                        "year": "",
-                                        "category": "",
-                                        "chunk_level": "document",
-                                        "source_file": os.path.relpath(fpath, OUTPUT_DIR),
-                                    },
-                                }
-                            )
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(lambda task: task[0](*task[1]), tasks)
 
+    chunks = []
+    for result in results:
+        chunks.extend(result)
     return chunks
@@ -8,9 +8,16 @@ OLLAMA_BASE_URL = "http://localhost:11434"
 EMBEDDING_MODEL = "BAAI/bge-m3"
 LLM_MODEL = "exaone3.5:32b"
 
+# 임베딩 디바이스/배치 (CUDA에서는 fp16으로 인코딩)
+EMBED_DEVICE = os.environ.get("EMBED_DEVICE", "cuda")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+
 CHROMA_COLLECTION = "residency_curriculum"
 TOP_K = 5
 
+# 인덱싱 upsert 배치 크기 (작으면 호출당 오버헤드가 커짐)
+INDEX_BATCH_SIZE = int(os.environ.get("INDEX_BATCH_SIZE", "512"))
+
 # 전공 유사어 매핑 (정확한 전공명 매칭 실패 시 사용)
 SPECIALTY_ALIASES = {
     "병리과": ["병리학회", "병리학", "병리"],
@@ -59,7 +66,7 @@ MULTI_QUERY_COUNT = 3  # 원본 포함 총 쿼리 수
 
 # Hybrid Search (BM25 + Vector) 설정
 HYBRID_SEARCH_ENABLED = True
-BM25_PERSIST_PATH = os.path.join(BASE_DIR, "bm25_index.pkl")
+BM25_PERSIST_PATH = os.path.join(BASE_DIR, "bm25_index.npz")
 RRF_K = 60                 # RRF smoothing constant
 BM25_WEIGHT = 1.0           # RRF weight for BM25
 VECTOR_WEIGHT = 1.0         # RRF weight for Vector
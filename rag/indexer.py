@@ -1,10 +1,17 @@
 import os
+import time
 
-import chromadb
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+# chromadb/sentence-transformers는 import 비용이 커서 실제 사용 시점에 lazy 로드
 
 from .bm25_index import rebuild_bm25_index
-from .config import CHROMA_COLLECTION, CHROMA_PERSIST_DIR, EMBEDDING_MODEL
+from .config import (
+    CHROMA_COLLECTION,
+    CHROMA_PERSIST_DIR,
+    EMBED_BATCH_SIZE,
+    EMBED_DEVICE,
+    EMBEDDING_MODEL,
+    INDEX_BATCH_SIZE,
+)
 
 # ── 모듈 레벨 캐싱 (임베딩 모델·클라이언트·컬렉션을 한 번만 로드) ──
 _embedding_fn = None
@@ -12,12 +19,38 @@ _client = None
 _collection = None
 
 
+class _SentenceTransformerEmbedding:
+    """Chroma 호환 SentenceTransformer 임베딩 함수.
+
+    기본 SentenceTransformerEmbeddingFunction과 달리 CUDA에서는 fp16으로
+    인코딩하고(처리량 ~2배, VRAM 절반) 배치 크기를 설정에서 제어한다.
+    """
+
+    def __init__(self, model_name: str, device: str, batch_size: int):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device=device)
+        if device.startswith("cuda"):
+            import torch
+
+            self._model = self._model.half()
+            torch.set_float32_matmul_precision("high")
+        self._batch_size = batch_size
+
+    def __call__(self, input):
+        return self._model.encode(
+            list(input),
+            batch_size=self._batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).tolist()
+
+
 def _get_embedding_fn():
     global _embedding_fn
     if _embedding_fn is None:
-        _embedding_fn = SentenceTransformerEmbeddingFunction(
-            model_name=EMBEDDING_MODEL,
-            device="cuda",
+        _embedding_fn = _SentenceTransformerEmbedding(
+            EMBEDDING_MODEL, EMBED_DEVICE, EMBED_BATCH_SIZE
         )
     return _embedding_fn
 
@@ -25,6 +58,8 @@ def _get_embedding_fn():
 def _get_client():
     global _client
     if _client is None:
+        import chromadb
+
         _client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
     return _client
 
@@ -41,28 +76,44 @@ def get_collection():
     return _collection
 
 
+# is_index_built의 count() 결과 TTL 캐시 (호출마다 DB 왕복하지 않도록)
+_COUNT_CACHE_TTL = 5.0
+_count_cache = {"ts": 0.0, "val": False}
+
+
 def is_index_built() -> bool:
+    if time.monotonic() - _count_cache["ts"] < _COUNT_CACHE_TTL:
+        return _count_cache["val"]
+
     if not os.path.isdir(CHROMA_PERSIST_DIR):
-        return False
-    try:
-        col = get_collection()
-        return col.count() > 0
-    except Exception:
-        return False
+        built = False
+    else:
+        try:
+            built = get_collection().count() > 0
+        except Exception:
+            built = False
+
+    _count_cache["ts"] = time.monotonic()
+    _count_cache["val"] = built
+    return built
 
 
 def index_chunks(chunks: list[dict]) -> int:
     col = get_collection()
-    batch_size = 50
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i : i + batch_size]
-        col.upsert(
-            ids=[c["id"] for c in batch],
-            documents=[c["text"] for c in batch],
-            metadatas=[c["metadata"] for c in batch],
-        )
+    for i in range(0, len(chunks), INDEX_BATCH_SIZE):
+        batch = chunks[i : i + INDEX_BATCH_SIZE]
+        ids = []
+        docs = []
+        metas = []
+        for c in batch:
+            ids.append(c["id"])
+            docs.append(c["text"])
+            metas.append(c["metadata"])
+        col.upsert(ids=ids, documents=docs, metadatas=metas)
     rebuild_bm25_index(chunks)
-    return col.count()
+    _count_cache["ts"] = 0.0  # 인덱스가 바뀌었으므로 캐시 무효화
+    # upsert가 모두 성공했으므로 count() 왕복 없이 입력 길이를 그대로 반환
+    return len(chunks)
 
 
 def rebuild_index(chunks: list[dict]) -> int:
@@ -1,16 +1,25 @@
-import json
 from collections.abc import Iterator
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson as _json  # NDJSON 라인 파싱이 stdlib json보다 수 배 빠름
+except ImportError:
+    import json as _json
 
 from .config import LLM_MODEL, OLLAMA_BASE_URL, RAG_PROMPT_TEMPLATE, SYSTEM_PROMPT
 
+# 요청마다 TCP 연결을 새로 맺지 않도록 keep-alive 커넥션 풀 재사용
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
 
 def generate_stream(
     question: str, context: str, system: str = SYSTEM_PROMPT
 ) -> Iterator[str]:
     prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
-    response = requests.post(
+    response = _SESSION.post(
         f"{OLLAMA_BASE_URL}/api/generate",
         json={
             "model": LLM_MODEL,
@@ -27,6 +36,6 @@ def generate_stream(
     response.raise_for_status()
     for line in response.iter_lines():
         if line:
-            data = json.loads(line)
+            data = _json.loads(line)
             if "response" in data:
                 yield data["response"]
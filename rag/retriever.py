@@ -1,7 +1,16 @@
+import atexit
+import functools
 import re
 from concurrent.futures import ThreadPoolExecutor
 
-from .bm25_index import get_bm25_index
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # 선택 의존성 — 없으면 기존 substring 스캔으로 폴백
+    ahocorasick = None
+
+from .bm25_index import RetrievedItem, get_bm25_index
 from .config import (
     BM25_TOP_K_MULTIPLIER,
     BM25_WEIGHT,
@@ -19,23 +28,107 @@ from .indexer import get_collection
 # 첨부 문서 참조를 암시하는 키워드
 _ATTACHMENT_HINTS = ("점수", "기준", "별지", "별첨", "첨부", "연수교육", "학술대회 목록")
 
+# 키워드별 개별 substring 스캔 대신 하나의 교대 패턴으로 한 번에 탐색
+_ATTACHMENT_RE = re.compile("|".join(map(re.escape, _ATTACHMENT_HINTS)))
+
+# 일반 문서 감지 키워드 -> doc_type (순서가 우선순위)
+_DOC_TYPE_KEYWORDS = {
+    "부칙": "부칙",
+    "총칙": "총칙",
+    "인턴": "인턴수련",
+    "교육목표": "교육목표",
+}
+_DOC_TYPE_RE = re.compile("|".join(map(re.escape, _DOC_TYPE_KEYWORDS)))
+
+# 연차 감지 패턴 (쿼리마다 re 캐시를 타지 않도록 미리 컴파일)
+_YEAR_RE = re.compile(r"(\d)\s*[년연]\s*차")
+
+# 연차순 정렬 순서 (1→2→3→4→총계→비고)
+_YEAR_ORDER = {"1": 0, "2": 1, "3": 2, "4": 3, "총계": 4, "비고": 5}
+
+# 전공명/유사어는 긴 이름 우선 매칭 순서로 정렬해 모듈 로드 시 고정
+_SPECIALTIES_BY_LEN = sorted(SPECIALTIES, key=len, reverse=True)
+_ALIASES_BY_LEN = {
+    spec: sorted(aliases, key=len, reverse=True)
+    for spec, aliases in SPECIALTY_ALIASES.items()
+}
+
+# 구분 키워드 -> 카테고리 (순서가 우선순위)
+_CAT_KEYWORDS = {
+    "환자취급": "환자취급범위",
+    "교과내용": "교과내용",
+    "교과 내용": "교과내용",
+    "학술회의": "학술회의참석",
+    "논문": "논문제출",
+    "타과파견": "타과파견",
+    "타과 파견": "타과파견",
+    "기타": "기타요건",
+}
+
+
+def _build_keyword_automaton():
+    """전공명/유사어/구분 키워드를 한 번의 선형 스캔으로 찾는 Aho-Corasick automaton"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for spec in SPECIALTIES:
+        automaton.add_word(spec, spec)
+    for aliases in SPECIALTY_ALIASES.values():
+        for alias in aliases:
+            automaton.add_word(alias, alias)
+    for keyword in _CAT_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
 
 def extract_query_filters(question: str) -> dict | None:
-    """질문에서 전공명/연차를 감지하여 ChromaDB where 필터 생성"""
+    """질문에서 전공명/연차를 감지하여 ChromaDB where 필터 생성.
+
+    Multi-Query 변형·재질문으로 같은 질문이 반복되므로 결과를 LRU 캐시한다.
+    (캐시에는 불변 튜플로 저장하고 호출 시 dict로 복원)
+    """
+    conditions = _extract_query_conditions(question)
+    if conditions is None:
+        return None
+    if len(conditions) == 1:
+        key, value = conditions[0]
+        return {key: value}
+    return {"$and": [{key: value} for key, value in conditions]}
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_query_conditions(question: str) -> tuple[tuple[str, str], ...] | None:
+    """질문에서 감지한 필터 조건들을 (field, value) 튜플로 반환"""
     filters = []
-    needs_attachment = any(kw in question for kw in _ATTACHMENT_HINTS)
+    needs_attachment = _ATTACHMENT_RE.search(question) is not None
+
+    if _KEYWORD_AUTOMATON is not None:
+        # automaton 한 번의 스캔으로 등장 키워드 집합을 만들고 집합 조회로 대체
+        found = {word for _, word in _KEYWORD_AUTOMATON.iter(question)}
+
+        def _has(keyword):
+            return keyword in found
+
+    else:
+
+        def _has(keyword):
+            return keyword in question
 
     # 전공명 감지 (긴 이름부터 매칭하여 '외과' < '성형외과' 문제 방지)
-    for spec in sorted(SPECIALTIES, key=len, reverse=True):
-        if spec in question:
+    for spec in _SPECIALTIES_BY_LEN:
+        if _has(spec):
             filters.append({"specialty": spec})
             break
 
     # 유사어 매칭 (정확한 전공명 매칭 실패 시)
     if not any("specialty" in f for f in filters):
-        for spec, aliases in SPECIALTY_ALIASES.items():
-            for alias in sorted(aliases, key=len, reverse=True):
-                if alias in question:
+        for spec, aliases in _ALIASES_BY_LEN.items():
+            for alias in aliases:
+                if _has(alias):
                     filters.append({"specialty": spec})
                     break
             if any("specialty" in f for f in filters):
@@ -43,12 +136,11 @@ def extract_query_filters(question: str) -> dict | None:
 
     # 첨부 문서가 필요한 경우: 구분/연차 필터 없이 전공 필터만 적용
     if needs_attachment:
-        if not filters:
-            return {"doc_type": "첨부"}
-        return {"$and": filters + [{"doc_type": "첨부"}]}
+        filters.append({"doc_type": "첨부"})
+        return tuple((k, v) for f in filters for k, v in f.items())
 
     # 연차 감지
-    m = re.search(r"(\d)\s*[년연]\s*차", question)
+    m = _YEAR_RE.search(question)
     if m:
         filters.append({"year": m.group(1)})
 
@@ -59,39 +151,26 @@ def extract_query_filters(question: str) -> dict | None:
         filters.append({"year": "비고"})
 
     # 구분 감지
-    cat_keywords = {
-        "환자취급": "환자취급범위",
-        "교과내용": "교과내용",
-        "교과 내용": "교과내용",
-        "학술회의": "학술회의참석",
-        "논문": "논문제출",
-        "타과파견": "타과파견",
-        "타과 파견": "타과파견",
-        "기타": "기타요건",
-    }
-    for keyword, cat in cat_keywords.items():
-        if keyword in question:
+    for keyword, cat in _CAT_KEYWORDS.items():
+        if _has(keyword):
             filters.append({"category": cat})
             break
 
-    # 일반 문서 감지
-    if "부칙" in question:
-        filters.append({"doc_type": "부칙"})
-    elif "총칙" in question:
-        filters.append({"doc_type": "총칙"})
-    elif "인턴" in question:
-        filters.append({"doc_type": "인턴수련"})
-    elif "교육목표" in question:
-        filters.append({"doc_type": "교육목표"})
+    # 일반 문서 감지 (한 번의 스캔으로 등장 키워드 수집 후 우선순위 적용)
+    doc_hits = set(_DOC_TYPE_RE.findall(question))
+    for keyword, doc_type in _DOC_TYPE_KEYWORDS.items():
+        if keyword in doc_hits:
+            filters.append({"doc_type": doc_type})
+            break
 
     if not filters:
         return None
-    if len(filters) == 1:
-        return filters[0]
-    return {"$and": filters}
+    return tuple((k, v) for f in filters for k, v in f.items())
 
 
-def _query(col, question: str, top_k: int, where_filter: dict | None) -> list[dict]:
+def _query(
+    col, question: str, top_k: int, where_filter: dict | None
+) -> list[RetrievedItem]:
     """공통 ChromaDB 쿼리 로직"""
     query_params = {
         "query_texts": [question],
@@ -109,12 +188,12 @@ def _query(col, question: str, top_k: int, where_filter: dict | None) -> list[di
     if results and results["documents"]:
         for i, doc in enumerate(results["documents"][0]):
             items.append(
-                {
-                    "id": results["ids"][0][i] if results["ids"] else "",
-                    "text": doc,
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "distance": results["distances"][0][i] if results["distances"] else 0,
-                }
+                RetrievedItem(
+                    id=results["ids"][0][i] if results["ids"] else "",
+                    text=doc,
+                    metadata=results["metadatas"][0][i] if results["metadatas"] else {},
+                    distance=results["distances"][0][i] if results["distances"] else 0,
+                )
             )
     return items
 
@@ -138,6 +217,9 @@ _QUERY_SYNONYMS = {
     "연차": ["년차"],
 }
 
+# 유의어 치환도 긴 단어 우선 — 정렬은 모듈 로드 시 한 번만
+_SYNONYMS_BY_LEN = sorted(_QUERY_SYNONYMS, key=len, reverse=True)
+
 # Multi-Query: 구조 변환 패턴
 _REFORMULATIONS = [
     ("알려줘", "관련 내용"),
@@ -152,14 +234,43 @@ _REFORMULATIONS = [
 ]
 
 
+def _build_variation_automaton():
+    """유의어/구조 변환 패턴을 한 번의 스캔으로 찾는 automaton (없으면 None)"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for term in _QUERY_SYNONYMS:
+        automaton.add_word(term, term)
+    for pattern, _ in _REFORMULATIONS:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return automaton
+
+
+_VARIATION_AUTOMATON = _build_variation_automaton()
+
+
 def _generate_query_variations(question: str, n: int = 2) -> list[str]:
     """질문에서 유의어 치환/구조 변환을 통해 n개의 변형 쿼리 생성"""
     variations = []
 
+    # 아래 루프들은 모두 첫 치환에서 break하므로 등장 여부 검사는
+    # 원본 질문 기준 — automaton 한 번의 스캔 결과를 공유할 수 있다
+    if _VARIATION_AUTOMATON is not None:
+        found = {word for _, word in _VARIATION_AUTOMATON.iter(question)}
+
+        def _has(term):
+            return term in found
+
+    else:
+
+        def _has(term):
+            return term in question
+
     # 변형 1: 유의어 치환 (긴 단어 우선 매칭)
     syn_variation = question
-    for term in sorted(_QUERY_SYNONYMS, key=len, reverse=True):
-        if term in syn_variation:
+    for term in _SYNONYMS_BY_LEN:
+        if _has(term):
             syn_variation = syn_variation.replace(term, _QUERY_SYNONYMS[term][0], 1)
             break
     if syn_variation != question:
@@ -168,7 +279,7 @@ def _generate_query_variations(question: str, n: int = 2) -> list[str]:
     # 변형 2: 구조 변환 (질문형→서술형)
     reformulated = question
     for pattern, replacement in _REFORMULATIONS:
-        if pattern in reformulated:
+        if _has(pattern):
             reformulated = reformulated.replace(pattern, replacement).strip()
             break
     if reformulated != question and reformulated not in variations:
@@ -178,8 +289,8 @@ def _generate_query_variations(question: str, n: int = 2) -> list[str]:
     if len(variations) < n:
         syn2 = question
         found_first = False
-        for term in sorted(_QUERY_SYNONYMS, key=len, reverse=True):
-            if term in syn2:
+        for term in _SYNONYMS_BY_LEN:
+            if _has(term):
                 if not found_first:
                     found_first = True
                     continue
@@ -191,115 +302,148 @@ def _generate_query_variations(question: str, n: int = 2) -> list[str]:
     return variations[:n]
 
 
+# Multi-query 변형 검색용 공용 풀 (호출마다 스레드를 만들고 join하지 않도록 재사용)
+_MQ_EXECUTOR = ThreadPoolExecutor(max_workers=max(MULTI_QUERY_COUNT, 4), thread_name_prefix="mq")
+atexit.register(_MQ_EXECUTOR.shutdown)
+
+
 def _multi_query(
     col, question: str, top_k: int, where_filter: dict | None
-) -> list[dict]:
+) -> list[RetrievedItem]:
     """Multi-query retrieval: 여러 쿼리 변형으로 검색 후 결과 병합"""
     if not MULTI_QUERY_ENABLED:
         return _query(col, question, top_k, where_filter)
 
     variations = _generate_query_variations(question, n=MULTI_QUERY_COUNT - 1)
+    if not variations:
+        # 변형이 없으면 스레드 풀을 거치지 않고 단일 쿼리로 바로 처리
+        return _query(col, question, top_k, where_filter)
     all_queries = [question] + variations
 
     def run_query(q):
         return _query(col, q, top_k, where_filter)
 
-    with ThreadPoolExecutor(max_workers=len(all_queries)) as executor:
-        all_results = list(executor.map(run_query, all_queries))
+    all_results = list(_MQ_EXECUTOR.map(run_query, all_queries))
 
-    # document ID 기준 중복 제거 (최소 distance 유지)
-    best: dict[str, dict] = {}
+    # document ID 기준 중복 제거 (최소 distance 유지, 동점이면 먼저 등장한 항목):
+    # 한 번의 선형 스캔으로 id별 (최소 distance, 최초 등장 위치, 항목)을 모으고
+    # (distance, 최초 등장 위치) 키로 정렬 — 동점 처리까지 기존 dict+안정 정렬과 동일
+    best: dict[str, list] = {}
+    position = 0
     for result_set in all_results:
         for item in result_set:
-            doc_id = item["id"]
-            if doc_id not in best or item["distance"] < best[doc_id]["distance"]:
-                best[doc_id] = item
-
-    deduped = sorted(best.values(), key=lambda x: x["distance"])
-    return deduped[:top_k]
-
-
-def _is_attachment_filter(where_filter: dict) -> bool:
-    """이미 첨부 필터가 적용된 쿼리인지 확인"""
-    if where_filter.get("doc_type") == "첨부":
-        return True
-    for cond in where_filter.get("$and", []):
-        if cond.get("doc_type") == "첨부":
-            return True
-    return False
-
-
-def _extract_specialty_filter(where_filter: dict) -> dict | None:
-    """where 필터에서 전공 조건만 추출"""
+            entry = best.get(item.id)
+            if entry is None:
+                best[item.id] = [item.distance, position, item]
+            elif item.distance < entry[0]:
+                entry[0] = item.distance
+                entry[2] = item
+            position += 1
+
+    deduped = sorted(best.values(), key=lambda entry: (entry[0], entry[1]))
+    return [entry[2] for entry in deduped[:top_k]]
+
+
+def _inspect_filter(where_filter: dict) -> tuple[bool, dict | None]:
+    """where 필터를 한 번만 순회해 (첨부 필터 여부, 전공 조건)을 함께 반환"""
+    is_attachment = where_filter.get("doc_type") == "첨부"
+    spec_filter = None
     if "specialty" in where_filter:
-        return {"specialty": where_filter["specialty"]}
+        spec_filter = {"specialty": where_filter["specialty"]}
     for cond in where_filter.get("$and", []):
-        if "specialty" in cond:
-            return cond
-    return None
+        if cond.get("doc_type") == "첨부":
+            is_attachment = True
+        if spec_filter is None and "specialty" in cond:
+            spec_filter = cond
+    return is_attachment, spec_filter
 
 
 def _reciprocal_rank_fusion(
-    vector_results: list[dict],
-    bm25_results: list[dict],
+    vector_results: list[RetrievedItem],
+    bm25_results: list[RetrievedItem],
     top_k: int,
-) -> list[dict]:
-    """Reciprocal Rank Fusion: 벡터 검색과 BM25 검색 결과를 순위 기반으로 융합"""
-    rrf_scores: dict[str, float] = {}
-    doc_map: dict[str, dict] = {}
-
-    for rank, item in enumerate(vector_results, start=1):
-        doc_id = item["id"]
-        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + VECTOR_WEIGHT / (RRF_K + rank)
-        if doc_id not in doc_map:
-            doc_map[doc_id] = item
-
-    for rank, item in enumerate(bm25_results, start=1):
-        doc_id = item["id"]
-        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + BM25_WEIGHT / (RRF_K + rank)
-        if doc_id not in doc_map:
-            doc_map[doc_id] = item
-
-    sorted_ids = sorted(rrf_scores, key=rrf_scores.get, reverse=True)
-
-    fused = []
-    for doc_id in sorted_ids[:top_k]:
-        item = doc_map[doc_id].copy()
-        item.pop("bm25_score", None)
-        item.pop("distance", None)
-        fused.append(item)
-
-    return fused
-
-
-def retrieve(question: str, top_k: int = TOP_K) -> list[dict]:
+) -> list[RetrievedItem]:
+    """Reciprocal Rank Fusion: 벡터 검색과 BM25 검색 결과를 순위 기반으로 융합
+
+    점수 누적은 NumPy 배열에 np.add.at으로 모으고, 상위 top_k는 안정
+    argsort로 뽑는다 (동점 시 먼저 등장한 문서 우선 — dict 순회 기준과 동일).
+    """
+    doc_map: dict[str, RetrievedItem] = {}
+    for item in vector_results:
+        doc_map.setdefault(item.id, item)
+    for item in bm25_results:
+        doc_map.setdefault(item.id, item)
+    if not doc_map:
+        return []
+
+    ids = list(doc_map)
+    id_to_idx = {doc_id: i for i, doc_id in enumerate(ids)}
+    scores = np.zeros(len(ids))
+
+    for results, weight in ((vector_results, VECTOR_WEIGHT), (bm25_results, BM25_WEIGHT)):
+        if not results:
+            continue
+        ranks = np.arange(1, len(results) + 1, dtype=np.float64)
+        idxs = np.fromiter(
+            (id_to_idx[item.id] for item in results),
+            dtype=np.int32,
+            count=len(results),
+        )
+        np.add.at(scores, idxs, weight / (RRF_K + ranks))
+
+    # 후보는 최대 2*fetch_k 수준이라 부분 선택의 이득이 없고, 동점이 흔해
+    # (가중치가 같으면 한쪽 retriever의 같은 rank끼리 점수가 정확히 같음)
+    # 경계에서의 선택까지 먼저 등장한 문서를 우선해야 하므로 전체 안정 정렬 사용
+    top = np.argsort(-scores, kind="stable")[: min(top_k, len(ids))]
+
+    return [doc_map[ids[idx]] for idx in top]
+
+
+# 벡터/BM25/첨부 보완 검색을 병렬 실행하기 위한 공용 풀 (호출마다 생성하지 않음)
+_RETRIEVAL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieve")
+
+
+def retrieve(question: str, top_k: int = TOP_K) -> list[RetrievedItem]:
     col = get_collection()
     where_filter = extract_query_filters(question)
 
     fetch_k = top_k * BM25_TOP_K_MULTIPLIER
 
-    # 1a: Multi-query 벡터 검색
-    vector_items = _multi_query(col, question, fetch_k, where_filter)
-
-    # 1b: BM25 키워드 검색 + RRF 융합
+    # 1a: Multi-query 벡터 검색 / 1b: BM25 키워드 검색 — 서로 독립이므로 병렬 제출
+    vector_future = _RETRIEVAL_EXECUTOR.submit(
+        _multi_query, col, question, fetch_k, where_filter
+    )
+    bm25_future = None
     if HYBRID_SEARCH_ENABLED:
         bm25_idx = get_bm25_index()
-        bm25_items = bm25_idx.query(question, fetch_k, where_filter)
-        items = _reciprocal_rank_fusion(vector_items, bm25_items, top_k)
-    else:
-        items = vector_items[:top_k]
+        bm25_future = _RETRIEVAL_EXECUTOR.submit(
+            bm25_idx.query, question, fetch_k, where_filter
+        )
 
-    # 2단계: 1차 결과에 첨부 문서가 없고, 첨부 필터가 아닌 경우 첨부 보완 검색
-    has_attachment = any(r["metadata"].get("doc_type") == "첨부" for r in items)
-    if not has_attachment and where_filter and not _is_attachment_filter(where_filter):
-        spec_filter = _extract_specialty_filter(where_filter)
+    # 2단계 첨부 보완 검색도 투기적으로 미리 실행 (1차 결과에 첨부가 있으면 버림)
+    att_future = None
+    if where_filter:
+        is_attachment_query, spec_filter = _inspect_filter(where_filter)
+    else:
+        is_attachment_query, spec_filter = False, None
+    if where_filter and not is_attachment_query:
         if spec_filter:
             att_filter = {"$and": [spec_filter, {"doc_type": "첨부"}]}
         else:
             att_filter = {"doc_type": "첨부"}
-        att_items = _query(col, question, 2, att_filter)
-        for item in att_items:
-            if item["distance"] < 1.5:
+        att_future = _RETRIEVAL_EXECUTOR.submit(_query, col, question, 2, att_filter)
+
+    vector_items = vector_future.result()
+    if bm25_future is not None:
+        items = _reciprocal_rank_fusion(vector_items, bm25_future.result(), top_k)
+    else:
+        items = vector_items[:top_k]
+
+    # 1차 결과에 첨부 문서가 없는 경우에만 보완 검색 결과 사용
+    has_attachment = any(r.metadata.get("doc_type") == "첨부" for r in items)
+    if att_future is not None and not has_attachment:
+        for item in att_future.result():
+            if item.distance < 1.5:
                 items.append(item)
 
     # 특정 연차 질문 시 총계/비고 제외
@@ -308,17 +452,19 @@ def retrieve(question: str, top_k: int = TOP_K) -> list[dict]:
         for f in (where_filter.get("$and", []) if "$and" in (where_filter or {}) else [where_filter or {}])
     )
     if has_year:
-        items = [r for r in items if r["metadata"].get("year") not in ("총계", "비고")]
+        items = [r for r in items if r.metadata.get("year") not in ("총계", "비고")]
 
-    # 연차순 정렬 (1→2→3→4→총계→비고)
-    YEAR_ORDER = {"1": 0, "2": 1, "3": 2, "4": 3, "총계": 4, "비고": 5}
-    items.sort(key=lambda x: YEAR_ORDER.get(x["metadata"].get("year", ""), 99))
-
-    return items
+    # 연차순 정렬: 항목당 키를 한 번만 계산한 뒤 (키, 위치) 쌍으로 정렬
+    keys = [
+        (_YEAR_ORDER.get(r.metadata.get("year", ""), 99), i)
+        for i, r in enumerate(items)
+    ]
+    keys.sort()
+    return [items[i] for _, i in keys]
 
 
-def format_context(results: list[dict]) -> str:
+def format_context(results: list[RetrievedItem]) -> str:
     parts = []
     for r in results:
-        parts.append(r["text"])
+        parts.append(r.text)
     return "\n\n".join(parts)